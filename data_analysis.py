@@ -1,18 +1,23 @@
-import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+import matplotlib
+matplotlib.use('Agg')  # Plots are only written to PNG files, never shown interactively
 import matplotlib.pyplot as plt
 import numpy as np
+from prepare_parquet import read_nass_csv, clean_nass_data
+from plot_series import split_series
 
 def load_and_process_data():
-    """Load and process all three datasets"""
+    """Load and process all three datasets (Value is converted to Value_Numeric once here)"""
     
-    # Load Cropland Value data (Plot 1)
-    cropland_df = pd.read_csv('Cropland Value.csv')
+    # Read the Cropland Value (Plot 1), Crop Prices (Plot 2) and NASS Price Received Index (Plot 3)
+    # files in parallel; the PyArrow reader releases the GIL while parsing
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        cropland_df, crop_prices_df, price_index_df = executor.map(
+            lambda path: clean_nass_data(read_nass_csv(path)),
+            ['Cropland Value.csv', 'Crop Prices.csv', 'NASS-Data.csv']
+        )
     
-    # Load Crop Prices data (Plot 2)  
-    crop_prices_df = pd.read_csv('Crop Prices.csv')
-    
-    # Load NASS Price Received Index data (Plot 3)
-    price_index_df = pd.read_csv('NASS-Data.csv')
+    price_index_df = price_index_df.sort_values('Year', ignore_index=True)
     
     return cropland_df, crop_prices_df, price_index_df
 
@@ -21,21 +26,21 @@ def create_plot1_land_prices(cropland_df):
     
     # Filter for the specific states and year range
     states = ['KENTUCKY', 'INDIANA', 'OHIO', 'TENNESSEE']
-    filtered_df = cropland_df[cropland_df['State'].isin(states)].copy()
+    filtered_df = cropland_df.loc[cropland_df['State'].isin(states)]
     
     # Filter for years 1997-2025
-    filtered_df = filtered_df[(filtered_df['Year'] >= 1997) & (filtered_df['Year'] <= 2025)].copy()
-    
-    # Convert Value column to numeric (remove commas and convert to float)
-    filtered_df['Value_Numeric'] = filtered_df['Value'].str.replace(',', '').astype(float)
+    filtered_df = filtered_df.loc[(filtered_df['Year'] >= 1997) & (filtered_df['Year'] <= 2025)]
     
     # Create the plot
     plt.figure(figsize=(12, 8))
     
-    # Plot each state
+    # Plot each state (split once into per-state year/value arrays, shared with the Streamlit app)
+    state_series = split_series(filtered_df, 'State')
     for state in states:
-        state_data = filtered_df[filtered_df['State'] == state]
-        plt.plot(state_data['Year'], state_data['Value_Numeric'], 
+        if state not in state_series:
+            continue
+        years, values = state_series[state]
+        plt.plot(years, values, 
                 marker='o', linewidth=2, label=state.title())
     
     plt.title('Cropland Prices by State (1997-2025)', fontsize=16, fontweight='bold')
@@ -46,8 +51,8 @@ def create_plot1_land_prices(cropland_df):
     plt.tight_layout()
     
     # Save the plot
-    plt.savefig('plot1_land_prices.png', dpi=300, bbox_inches='tight')
-    plt.show()
+    plt.savefig('plot1_land_prices.png', dpi=150)
+    plt.close()
     
     return filtered_df
 
@@ -56,21 +61,21 @@ def create_plot2_crop_prices(crop_prices_df):
     
     # Filter for the specific commodities and year range
     commodities = ['CORN', 'SOYBEANS', 'WHEAT']
-    filtered_df = crop_prices_df[crop_prices_df['Commodity'].isin(commodities)].copy()
+    filtered_df = crop_prices_df.loc[crop_prices_df['Commodity'].isin(commodities)]
     
     # Filter for years 1975-2025
-    filtered_df = filtered_df[(filtered_df['Year'] >= 1975) & (filtered_df['Year'] <= 2025)].copy()
-    
-    # Convert Value column to numeric
-    filtered_df['Value_Numeric'] = pd.to_numeric(filtered_df['Value'], errors='coerce')
+    filtered_df = filtered_df.loc[(filtered_df['Year'] >= 1975) & (filtered_df['Year'] <= 2025)]
     
     # Create the plot
     plt.figure(figsize=(12, 8))
     
-    # Plot each commodity
+    # Plot each commodity (split once into per-commodity year/value arrays, shared with the Streamlit app)
+    commodity_series = split_series(filtered_df, 'Commodity')
     for commodity in commodities:
-        commodity_data = filtered_df[filtered_df['Commodity'] == commodity]
-        plt.plot(commodity_data['Year'], commodity_data['Value_Numeric'], 
+        if commodity not in commodity_series:
+            continue
+        years, values = commodity_series[commodity]
+        plt.plot(years, values, 
                 marker='o', linewidth=2, label=commodity.title())
     
     plt.title('National Crop Prices (1975-2025)', fontsize=16, fontweight='bold')
@@ -81,8 +86,8 @@ def create_plot2_crop_prices(crop_prices_df):
     plt.tight_layout()
     
     # Save the plot
-    plt.savefig('plot2_crop_prices.png', dpi=300, bbox_inches='tight')
-    plt.show()
+    plt.savefig('plot2_crop_prices.png', dpi=150)
+    plt.close()
     
     return filtered_df
 
@@ -90,13 +95,7 @@ def create_plot3_price_index(price_index_df):
     """Create Plot 3: National price received index from 1990-2025"""
     
     # Filter for years 1990-2025
-    filtered_df = price_index_df[(price_index_df['Year'] >= 1990) & (price_index_df['Year'] <= 2025)].copy()
-    
-    # Convert Value column to numeric
-    filtered_df['Value_Numeric'] = pd.to_numeric(filtered_df['Value'], errors='coerce')
-    
-    # Sort by year
-    filtered_df = filtered_df.sort_values('Year')
+    filtered_df = price_index_df.loc[(price_index_df['Year'] >= 1990) & (price_index_df['Year'] <= 2025)]
     
     # Create the plot
     plt.figure(figsize=(12, 8))
@@ -112,8 +111,8 @@ def create_plot3_price_index(price_index_df):
     plt.tight_layout()
     
     # Save the plot
-    plt.savefig('plot3_price_index.png', dpi=300, bbox_inches='tight')
-    plt.show()
+    plt.savefig('plot3_price_index.png', dpi=150)
+    plt.close()
     
     return filtered_df
 
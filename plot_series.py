@@ -0,0 +1,7 @@
+def split_series(df, by):
+    """Split df into {name: (years, values)} with contiguous int16/float32 arrays, each sorted by year"""
+    ordered = df.sort_values([by, 'Year'], kind='stable')
+    return {
+        name: (group['Year'].to_numpy(dtype='int16'), group['Value_Numeric'].to_numpy(dtype='float32'))
+        for name, group in ordered.groupby(by, observed=True, sort=False)
+    }
@@ -0,0 +1,47 @@
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+# Column types for the NASS Quick Stats exports, so the reader never has to infer them.
+# State and Commodity are categorical (kept through Parquet as dictionary columns), so the
+# .isin() filters in both apps compare int8 codes instead of hashing strings per row.
+# Year fits in int16 and Value_Numeric is stored as float32, halving the bytes every filter moves.
+CSV_DTYPES = {
+    'Year': 'int16',
+    'State': 'category',
+    'Commodity': 'category',
+    'Value': 'string[pyarrow]',
+}
+
+# Source CSV export -> cleaned Parquet file read by the Streamlit app
+DATASETS = {
+    'Cropland Value.csv': 'cropland.parquet',
+    'Crop Prices.csv': 'crop_prices.parquet',
+    'NASS-Data.csv': 'price_index.parquet',
+}
+
+# Signed decimal with optional leading dot and exponent, as pd.to_numeric accepts ('inf'/'nan' literals are not)
+NUMBER_PATTERN = r'^[+-]?(\d+(\.\d*)?|\.\d+)([eE][+-]?\d+)?$'
+
+def read_nass_csv(path):
+    """Read a NASS CSV export with the multithreaded PyArrow reader"""
+    return pd.read_csv(path, engine='pyarrow', dtype_backend='pyarrow', dtype=CSV_DTYPES)
+
+def parse_nass_values(values):
+    """Parse NASS Value strings to float32 with Arrow compute kernels; suppressed entries like "(D)" become NaN"""
+    stripped = pc.replace_substring(pc.utf8_trim_whitespace(pa.array(values)), ',', '')
+    numeric = pc.if_else(pc.match_substring_regex(stripped, NUMBER_PATTERN), stripped, None)
+    return pc.cast(numeric, pa.float32()).to_numpy(zero_copy_only=False)
+
+def clean_nass_data(df):
+    """Replace Value with a numeric column (NASS formats large values with thousands separators)"""
+    return df.assign(Value_Numeric=parse_nass_values(df['Value'])).drop(columns='Value')
+
+def main():
+    """Convert every CSV export to a cleaned, zstd-compressed Parquet file"""
+    for csv_path, parquet_path in DATASETS.items():
+        print(f"Converting {csv_path} -> {parquet_path}...")
+        clean_nass_data(read_nass_csv(csv_path)).to_parquet(parquet_path, compression='zstd')
+
+if __name__ == "__main__":
+    main()
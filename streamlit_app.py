@@ -1,8 +1,11 @@
+from concurrent.futures import ThreadPoolExecutor
 import streamlit as st
 import pandas as pd
+import numpy as np
 import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
+from plot_series import split_series
 
 # Set page configuration
 st.set_page_config(
@@ -11,71 +14,169 @@ st.set_page_config(
     layout="wide"
 )
 
+# States and crops offered in the sidebar
+AVAILABLE_STATES = ['KENTUCKY', 'INDIANA', 'OHIO', 'TENNESSEE']
+AVAILABLE_CROPS = ['CORN', 'SOYBEANS', 'WHEAT']
+
+# Series are only down-sampled once a plot holds more points than this
+DOWNSAMPLE_THRESHOLD = 2000
+# Points kept per down-sampled series, roughly one per pixel of chart width
+MAX_PLOT_POINTS = 800
+
+# Bounds for the per-selection caches, which are shared by every session on the server.
+# Cached functions take the data loaded by load_data() as an underscore-prefixed argument so
+# Streamlit skips hashing it; the selection and year range arguments fully determine the result.
+SELECTION_CACHE_MAX_ENTRIES = 64
+SELECTION_CACHE_TTL = 3600  # seconds
+
 @st.cache_data
 def load_data():
     """Load and cache all datasets"""
     try:
-        cropland_df = pd.read_csv('Cropland Value.csv')
-        crop_prices_df = pd.read_csv('Crop Prices.csv')
-        price_index_df = pd.read_csv('NASS-Data.csv')
-        return cropland_df, crop_prices_df, price_index_df
+        # Parquet files are produced once from the CSV exports by prepare_parquet.py; the three
+        # independent reads run in parallel since Arrow releases the GIL while scanning
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            cropland_df, crop_prices_df, price_index_df = executor.map(
+                lambda dataset: pd.read_parquet(dataset[0], columns=dataset[1]),
+                [
+                    ('cropland.parquet', ['Year', 'State', 'Value_Numeric']),
+                    ('crop_prices.parquet', ['Year', 'Commodity', 'Value_Numeric']),
+                    ('price_index.parquet', ['Year', 'Value_Numeric']),
+                ]
+            )
+        
+        # Sort by year once so year-range filters become a binary search plus a slice
+        cropland_df = cropland_df.sort_values('Year', kind='stable', ignore_index=True)
+        crop_prices_df = crop_prices_df.sort_values('Year', kind='stable', ignore_index=True)
+        price_index_df = price_index_df.sort_values('Year', kind='stable', ignore_index=True)
+        
+        # Slider bounds never change, so compute them once here rather than on every rerun
+        year_bounds = {
+            name: (int(df['Year'].min()), int(df['Year'].max()))
+            for name, df in [('cropland', cropland_df), ('crop_prices', crop_prices_df), ('price_index', price_index_df)]
+        }
+        
+        # Per-state / per-crop (years, values) arrays shared by every chart that draws one trace per series
+        series = {
+            'cropland': split_series(cropland_df, 'State'),
+            'crop_prices': split_series(crop_prices_df, 'Commodity'),
+        }
+        return cropland_df, crop_prices_df, price_index_df, year_bounds, series
     except FileNotFoundError as e:
         st.error(f"Error loading data: {e}")
-        return None, None, None
+        return None, None, None, None, None
+
+def slice_years(df, year_range):
+    """Select the rows of a Year-sorted DataFrame that fall within year_range"""
+    start, stop = np.searchsorted(df['Year'].to_numpy(), [year_range[0], year_range[1] + 1])
+    return df.iloc[start:stop]
 
-def process_cropland_data(cropland_df, selected_states, year_range):
+def latest_year_rows(df):
+    """Select the rows for the most recent year of a non-empty, Year-sorted DataFrame (a tail slice)"""
+    years = df['Year'].to_numpy()
+    return df.iloc[np.searchsorted(years, years[-1]):]
+
+@st.cache_data(max_entries=SELECTION_CACHE_MAX_ENTRIES, ttl=SELECTION_CACHE_TTL)
+def process_cropland_data(_cropland_df, selected_states, year_range):
     """Process cropland data for Plot 1"""
-    if cropland_df is None:
+    if _cropland_df is None:
         return None
     
-    # Filter for selected states and year range
-    filtered_df = cropland_df[cropland_df['State'].isin(selected_states)].copy()
-    filtered_df = filtered_df[(filtered_df['Year'] >= year_range[0]) & (filtered_df['Year'] <= year_range[1])].copy()
-    
-    # Convert Value column to numeric (remove commas)
-    filtered_df['Value_Numeric'] = filtered_df['Value'].str.replace(',', '').astype(float)
-    
-    return filtered_df
+    # Filter for year range, then selected states
+    filtered_df = slice_years(_cropland_df, year_range)
+    return filtered_df[filtered_df['State'].isin(selected_states)]
 
-def process_crop_prices_data(crop_prices_df, selected_crops, year_range):
+@st.cache_data(max_entries=SELECTION_CACHE_MAX_ENTRIES, ttl=SELECTION_CACHE_TTL)
+def process_crop_prices_data(_crop_prices_df, selected_crops, year_range):
     """Process crop prices data for Plot 2"""
-    if crop_prices_df is None:
+    if _crop_prices_df is None:
         return None
     
-    # Filter for selected commodities and year range
-    filtered_df = crop_prices_df[crop_prices_df['Commodity'].isin(selected_crops)].copy()
-    filtered_df = filtered_df[(filtered_df['Year'] >= year_range[0]) & (filtered_df['Year'] <= year_range[1])].copy()
-    
-    # Convert Value column to numeric
-    filtered_df['Value_Numeric'] = pd.to_numeric(filtered_df['Value'], errors='coerce')
-    
-    return filtered_df
+    # Filter for year range, then selected commodities
+    filtered_df = slice_years(_crop_prices_df, year_range)
+    return filtered_df[filtered_df['Commodity'].isin(selected_crops)]
 
-def process_price_index_data(price_index_df, year_range):
+@st.cache_data(max_entries=SELECTION_CACHE_MAX_ENTRIES, ttl=SELECTION_CACHE_TTL)
+def process_price_index_data(_price_index_df, year_range):
     """Process price index data for Plot 3"""
-    if price_index_df is None:
+    if _price_index_df is None:
         return None
     
-    # Filter for year range
-    filtered_df = price_index_df[(price_index_df['Year'] >= year_range[0]) & (price_index_df['Year'] <= year_range[1])].copy()
-    
-    # Convert Value column to numeric
-    filtered_df['Value_Numeric'] = pd.to_numeric(filtered_df['Value'], errors='coerce')
-    filtered_df = filtered_df.sort_values('Year')
+    # Filter for year range (already sorted by year at load time)
+    return slice_years(_price_index_df, year_range)
+
+def lttb_indices(x, y, n_out):
+    """Pick n_out points that preserve the shape of (x, y) using Largest-Triangle-Three-Buckets"""
+    n = len(x)
+    if n <= n_out or n_out < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    
+    # First and last points are always kept; the rest are split into n_out - 2 buckets
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.intp)
+    indices = np.empty(n_out, dtype=np.intp)
+    indices[0], indices[-1] = 0, n - 1
+    
+    selected = 0
+    for i in range(n_out - 2):
+        start, stop = edges[i], edges[i + 1]
+        next_stop = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x, avg_y = x[stop:next_stop].mean(), y[stop:next_stop].mean()
+        
+        # Keep the point forming the largest triangle with the last kept point and the next bucket's average
+        area = np.abs((x[selected] - avg_x) * (y[start:stop] - y[selected])
+                      - (x[selected] - x[start:stop]) * (avg_y - y[selected]))
+        selected = start + int(area.argmax())
+        indices[i + 1] = selected
     
-    return filtered_df
+    return indices
+
+def downsample_series(data):
+    """Down-sample a single Year-sorted series with LTTB when there are too many points to draw"""
+    if len(data) <= DOWNSAMPLE_THRESHOLD:
+        return data
+    return data.iloc[lttb_indices(data['Year'].to_numpy(), data['Value_Numeric'].to_numpy(), MAX_PLOT_POINTS)]
+
+def select_series(series, names, year_range):
+    """Slice the named (years, values) series to year_range with searchsorted, down-sampling when the plot is too dense"""
+    selected = {}
+    for name in names:
+        if name not in series:
+            continue
+        years, values = series[name]
+        start, stop = np.searchsorted(years, [year_range[0], year_range[1] + 1])
+        if stop > start:
+            selected[name] = (years[start:stop], values[start:stop])
+    
+    # Down-sample every series once the plot as a whole holds too many points
+    if sum(len(years) for years, _ in selected.values()) > DOWNSAMPLE_THRESHOLD:
+        for name, (years, values) in selected.items():
+            keep = lttb_indices(years, values, MAX_PLOT_POINTS)
+            selected[name] = (years[keep], values[keep])
+    return selected
 
-def create_plot1(data):
+@st.cache_resource(max_entries=SELECTION_CACHE_MAX_ENTRIES, ttl=SELECTION_CACHE_TTL)
+def create_plot1(states_key, year_range, _state_series):
     """Create interactive Plot 1: Cropland Prices by State"""
-    if data is None or data.empty:
+    selected = select_series(_state_series, states_key, year_range)
+    if not selected:
         return None
     
-    fig = px.line(data, x='Year', y='Value_Numeric', color='State',
-                  title='Cropland Prices by State',
-                  labels={'Value_Numeric': 'Price (Dollars per Acre)', 'Year': 'Year'},
-                  markers=True)
+    # Build one trace per state straight from the cached NumPy arrays (no px DataFrame introspection)
+    fig = go.Figure([
+        go.Scattergl(x=years, y=values,
+                     mode='lines+markers', name=name,
+                     hovertemplate='<b>State:</b> ' + name + '<br><b>Year:</b> %{x}<br>' +
+                                   '<b>Price (Dollars per Acre):</b> %{y}<extra></extra>')
+        for name, (years, values) in selected.items()
+    ])
     
     fig.update_layout(
+        title='Cropland Prices by State',
+        xaxis_title='Year',
+        yaxis_title='Price (Dollars per Acre)',
+        legend_title_text='State',
         title_font_size=16,
         xaxis_title_font_size=12,
         yaxis_title_font_size=12,
@@ -84,17 +185,27 @@ def create_plot1(data):
     
     return fig
 
-def create_plot2(data):
+@st.cache_resource(max_entries=SELECTION_CACHE_MAX_ENTRIES, ttl=SELECTION_CACHE_TTL)
+def create_plot2(crops_key, year_range, _crop_series):
     """Create interactive Plot 2: National Crop Prices"""
-    if data is None or data.empty:
+    selected = select_series(_crop_series, crops_key, year_range)
+    if not selected:
         return None
     
-    fig = px.line(data, x='Year', y='Value_Numeric', color='Commodity',
-                  title='National Crop Prices',
-                  labels={'Value_Numeric': 'Price (Dollars per Bushel)', 'Year': 'Year'},
-                  markers=True)
+    # Build one trace per commodity straight from the cached NumPy arrays (no px DataFrame introspection)
+    fig = go.Figure([
+        go.Scattergl(x=years, y=values,
+                     mode='lines+markers', name=name,
+                     hovertemplate='<b>Commodity:</b> ' + name + '<br><b>Year:</b> %{x}<br>' +
+                                   '<b>Price (Dollars per Bushel):</b> %{y}<extra></extra>')
+        for name, (years, values) in selected.items()
+    ])
     
     fig.update_layout(
+        title='National Crop Prices',
+        xaxis_title='Year',
+        yaxis_title='Price (Dollars per Bushel)',
+        legend_title_text='Commodity',
         title_font_size=16,
         xaxis_title_font_size=12,
         yaxis_title_font_size=12,
@@ -103,19 +214,20 @@ def create_plot2(data):
     
     return fig
 
-def create_plot3(data):
+@st.cache_resource(max_entries=SELECTION_CACHE_MAX_ENTRIES, ttl=SELECTION_CACHE_TTL)
+def create_plot3(year_range, _data):
     """Create interactive Plot 3: Price Received Index"""
-    if data is None or data.empty:
+    if _data is None or _data.empty:
         return None
     
     # Calculate percentage change from base year (2011 = 100)
-    data_copy = data.copy()
-    data_copy['Percent_Change'] = data_copy['Value_Numeric'] - 100
+    plot_data = downsample_series(_data).assign(Percent_Change=lambda d: d['Value_Numeric'] - 100)
     
-    fig = px.line(data_copy, x='Year', y='Value_Numeric',
+    fig = px.line(plot_data, x='Year', y='Value_Numeric',
                   title='National Price Level Trends (Food Commodities)',
                   labels={'Value_Numeric': 'Price Level Relative to 2011 (2011 = 100%)', 'Year': 'Year'},
                   markers=True,
+                  render_mode='webgl',
                   hover_data={'Percent_Change': ':.1f'})
     
     # Add horizontal reference line at 100 (2011 baseline)
@@ -128,7 +240,7 @@ def create_plot3(data):
         hovertemplate='<b>Year:</b> %{x}<br>' +
                       '<b>Price Level:</b> %{y:.1f}<br>' +
                       '<b>Change from 2011:</b> %{customdata[0]:+.1f}%<extra></extra>',
-        customdata=data_copy[['Percent_Change']]
+        customdata=plot_data[['Percent_Change']]
     )
     
     fig.update_layout(
@@ -167,10 +279,10 @@ def main():
     """)
     
     # Load data
-    cropland_df, crop_prices_df, price_index_df = load_data()
+    cropland_df, crop_prices_df, price_index_df, year_bounds, series = load_data()
     
     if cropland_df is None:
-        st.error("Unable to load data files. Please check that all CSV files are in the correct location.")
+        st.error("Unable to load data files. Please run prepare_parquet.py to convert the CSV files to Parquet.")
         return
     
     # Sidebar for controls
@@ -178,47 +290,42 @@ def main():
     
     # Plot 1 Controls
     st.sidebar.subheader("Plot 1: Cropland Prices")
-    available_states = ['KENTUCKY', 'INDIANA', 'OHIO', 'TENNESSEE']
     selected_states = st.sidebar.multiselect(
         "Select States:", 
-        available_states, 
-        default=available_states
+        AVAILABLE_STATES, 
+        default=AVAILABLE_STATES
     )
     
-    cropland_years = cropland_df['Year'].unique()
     plot1_year_range = st.sidebar.slider(
         "Year Range (Plot 1):",
-        min_value=int(cropland_years.min()),
-        max_value=int(cropland_years.max()),
+        min_value=year_bounds['cropland'][0],
+        max_value=year_bounds['cropland'][1],
         value=(1997, 2025),
         key="plot1_years"
     )
     
     # Plot 2 Controls
     st.sidebar.subheader("Plot 2: Crop Prices")
-    available_crops = ['CORN', 'SOYBEANS', 'WHEAT']
     selected_crops = st.sidebar.multiselect(
         "Select Crops:", 
-        available_crops, 
-        default=available_crops
+        AVAILABLE_CROPS, 
+        default=AVAILABLE_CROPS
     )
     
-    crop_years = crop_prices_df['Year'].unique()
     plot2_year_range = st.sidebar.slider(
         "Year Range (Plot 2):",
-        min_value=int(crop_years.min()),
-        max_value=int(crop_years.max()),
+        min_value=year_bounds['crop_prices'][0],
+        max_value=year_bounds['crop_prices'][1],
         value=(1975, 2025),
         key="plot2_years"
     )
     
     # Plot 3 Controls
     st.sidebar.subheader("Plot 3: Price Received Index")
-    index_years = price_index_df['Year'].unique()
     plot3_year_range = st.sidebar.slider(
         "Year Range (Plot 3):",
-        min_value=int(index_years.min()),
-        max_value=int(index_years.max()),
+        min_value=year_bounds['price_index'][0],
+        max_value=year_bounds['price_index'][1],
         value=(1990, 2024),
         key="plot3_years"
     )
@@ -230,8 +337,9 @@ def main():
     with col1:
         st.subheader("Plot 1: Cropland Prices by State")
         if selected_states:
-            plot1_data = process_cropland_data(cropland_df, selected_states, plot1_year_range)
-            fig1 = create_plot1(plot1_data)
+            states_key = tuple(sorted(selected_states))
+            plot1_data = process_cropland_data(cropland_df, states_key, plot1_year_range)
+            fig1 = create_plot1(states_key, plot1_year_range, series['cropland'])
             if fig1:
                 st.plotly_chart(fig1, use_container_width=True)
             else:
@@ -243,8 +351,9 @@ def main():
     with col2:
         st.subheader("Plot 2: National Crop Prices")
         if selected_crops:
-            plot2_data = process_crop_prices_data(crop_prices_df, selected_crops, plot2_year_range)
-            fig2 = create_plot2(plot2_data)
+            crops_key = tuple(sorted(selected_crops))
+            plot2_data = process_crop_prices_data(crop_prices_df, crops_key, plot2_year_range)
+            fig2 = create_plot2(crops_key, plot2_year_range, series['crop_prices'])
             if fig2:
                 st.plotly_chart(fig2, use_container_width=True)
             else:
@@ -256,7 +365,7 @@ def main():
     with col3:
         st.subheader("Plot 3: Price Received Index")
         plot3_data = process_price_index_data(price_index_df, plot3_year_range)
-        fig3 = create_plot3(plot3_data)
+        fig3 = create_plot3(plot3_year_range, plot3_data)
         if fig3:
             st.plotly_chart(fig3, use_container_width=True)
         else:
@@ -276,22 +385,22 @@ def main():
         
         # Add crop prices (primary y-axis) - smaller scale, more visible
         if selected_crops and plot2_data is not None and not plot2_data.empty:
-            for crop in selected_crops:
-                crop_data = plot2_data[plot2_data['Commodity'] == crop]
-                if not crop_data.empty:
-                    fig_combined.add_trace(
-                        go.Scatter(x=crop_data['Year'], y=crop_data['Value_Numeric'],
-                                 mode='lines+markers', name=f"{crop} Price ($/bu)",
-                                 line=dict(dash='dot', width=2)),
-                        secondary_y=False
-                    )
+            crop_series = select_series(series['crop_prices'], selected_crops, plot2_year_range)
+            for crop, (years, values) in crop_series.items():
+                fig_combined.add_trace(
+                    go.Scattergl(x=years, y=values,
+                               mode='lines+markers', name=f"{crop} Price ($/bu)",
+                               line=dict(dash='dot', width=2)),
+                    secondary_y=False
+                )
         
         # Add price index (secondary y-axis)
         if plot3_data is not None and not plot3_data.empty:
+            index_data = downsample_series(plot3_data)
             fig_combined.add_trace(
-                go.Scatter(x=plot3_data['Year'], y=plot3_data['Value_Numeric'],
-                         mode='lines+markers', name="Price Received Index",
-                         line=dict(color='green', width=3)),
+                go.Scattergl(x=index_data['Year'], y=index_data['Value_Numeric'],
+                           mode='lines+markers', name="Price Received Index",
+                           line=dict(color='green', width=3)),
                 secondary_y=True
             )
         
@@ -310,14 +419,13 @@ def main():
         if selected_states and plot1_data is not None and not plot1_data.empty:
             fig_land = go.Figure()
             
-            for state in selected_states:
-                state_data = plot1_data[plot1_data['State'] == state]
-                if not state_data.empty:
-                    fig_land.add_trace(
-                        go.Scatter(x=state_data['Year'], y=state_data['Value_Numeric'],
-                                 mode='lines+markers', name=f"{state} Land Price",
-                                 line=dict(width=2))
-                    )
+            state_series = select_series(series['cropland'], selected_states, plot1_year_range)
+            for state, (years, values) in state_series.items():
+                fig_land.add_trace(
+                    go.Scattergl(x=years, y=values,
+                               mode='lines+markers', name=f"{state} Land Price",
+                               line=dict(width=2))
+                )
             
             fig_land.update_layout(
                 title="Cropland Prices by State",
@@ -335,21 +443,21 @@ def main():
     
     with summary_col1:
         if selected_states and plot1_data is not None and not plot1_data.empty:
-            latest_land_prices = plot1_data[plot1_data['Year'] == plot1_data['Year'].max()]
+            latest_land_prices = latest_year_rows(plot1_data)
             st.metric("Latest Cropland Prices", 
                      f"${latest_land_prices['Value_Numeric'].mean():.0f}/acre",
                      f"Average across {len(selected_states)} states")
     
     with summary_col2:
         if selected_crops and plot2_data is not None and not plot2_data.empty:
-            latest_crop_prices = plot2_data[plot2_data['Year'] == plot2_data['Year'].max()]
+            latest_crop_prices = latest_year_rows(plot2_data)
             st.metric("Latest Crop Prices", 
                      f"${latest_crop_prices['Value_Numeric'].mean():.2f}/bu",
                      f"Average across {len(selected_crops)} crops")
     
     with summary_col3:
         if plot3_data is not None and not plot3_data.empty:
-            latest_index = plot3_data[plot3_data['Year'] == plot3_data['Year'].max()]
+            latest_index = latest_year_rows(plot3_data)
             if not latest_index.empty:
                 st.metric("Latest Price Index", 
                          f"{latest_index['Value_Numeric'].iloc[0]:.1f}",